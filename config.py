@@ -1,5 +1,8 @@
 # Embedding model and LLM model
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# EMBEDDING_MODEL = "static-minilm"  # Static token-table fast path (much faster, slightly lower quality)
+STATIC_EMBEDDING_MODEL = "minishlab/M2V_base_output"  # Distilled table used by the static backend
+EMBEDDING_BACKEND = "torch"  # "onnx" runs fused onnxruntime kernels, ~4x faster on CPU
 LLM_MODEL = "mistral:instruct"
 
 # Config params for RAG search
@@ -14,22 +14,43 @@ Other formats will be ignored. Once cleaned the data will be extracted to a unif
 # Standard imports
 import os
 import re
-import json
+import queue
+import hashlib
+import threading
 from pathlib import Path
+from functools import partial
 from typing import Tuple, List
+from concurrent.futures import ProcessPoolExecutor
 
 # Internal imports
-from utils import embed_text
+from utils import chunk_text, embed_texts
+from config import EMBEDDING_MODEL
 from const import PATH_TO_DATA, PATH_TO_CLEANED_DATA, PATH_TO_VECTORIZED_DATA
 
 # External imports
 import fitz
+import numpy as np
 import docx2txt
 from tqdm import tqdm
 import lxml.etree as et
 from pptx import Presentation
 
 
+# Compiled once at import so re doesn't re-parse the patterns per document
+_HYPHEN_RE = re.compile(r"(\w+)-\n(\w+)")
+_MID_LINE_BREAK_RE = re.compile(r"(?<!\n)\n(?!\n|\s*\w)")
+_SENTENCE_BREAK_RE = re.compile(r"([.!?])\n+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _clean_one(handler: "DataHandler", file: str) -> List[Tuple[str, str]]:
+    """
+    Module-level wrapper around DataHandler._clean_file so it can be pickled
+    and shipped to ProcessPoolExecutor worker processes.
+    """
+    return handler._clean_file(file)
+
+
 class DataHandler:
     """
     Class that handles the data for the RAG LLM.
@@ -74,6 +95,7 @@ class DataHandler:
         self.vectorized_data_path = vectorized_data_path
         self.data = []
         self.file_types = ["pdf", "docx", "txt", "pptx", "nxml"]
+        self._file_type_set = frozenset(self.file_types)  # O(1) extension lookups
         self.max_size_per_file = (
             max_size_per_file  # Maximum size of the dictionary before saving
         )
@@ -82,48 +104,105 @@ class DataHandler:
 
     def load_data(self) -> None:
         print("Loading data...")
-        for root, dirs, files in os.walk(self.data_path):
-            print(f"Reading {root}...")
-            for file in tqdm(files):
-                if file.split(".")[-1] in self.file_types:
-                    self.data.append(os.path.join(root, file))
-                # If .gitkeep file, ignore
-                elif file == ".gitkeep":
-                    continue
-                # Else delete the file
-                else:
-                    print(f"File {file} is not in the accepted file types. Deleting...")
-                    os.remove(os.path.join(root, file))
+        for path in tqdm(self.data_path.rglob("*")):
+            if not path.is_file():
+                continue
+            if path.suffix.lower().lstrip(".") in self._file_type_set:
+                self.data.append(str(path))
+            # If .gitkeep file, ignore
+            elif path.name == ".gitkeep":
+                continue
+            # Else skip the file (but leave it alone)
+            else:
+                print(f"File {path.name} is not in the accepted file types. Skipping...")
 
     def clean_data(self) -> None:
+        """
+        Function that cleans every loaded file. Each file is independent and
+        the cleaning is CPU-bound, so the work is spread across processes;
+        the file writes happen on a background thread so the next parse is
+        never blocked waiting on the disk.
+        """
         print("Cleaning data...")
-        for file in tqdm(self.data):
-            if file.split(".")[-1] in ["pdf", "PDF"]:
-                section_list = self.__clean_pdf(file)
-                for title, text in section_list:
-                    self.data_dict[title] = text
-                    self.__write_to_file(self.clean_data_path, title, text)
-                    continue
-            elif file.split(".")[-1] in ["txt", "TXT"]:
-                title, text = self.__clean_txt(file)
-            elif file.split(".")[-1] in ["docx", "DOCX"]:
-                title, text = self.__clean_docx(file)
-            elif file.split(".")[-1] in ["pptx", "PPTX"]:
-                title, text = self.__clean_pptx(file)
-            elif file.split(".")[-1] == "nxml":
-                title, text = self.__clean_nxml(file)
-            else:
-                print(
-                    f"File {file} is not in the accepted file types. Should have been deleted... Skipping..."
-                )
-                continue
 
-            if title is None or text is None:
-                print(f"Error cleaning {file}. Skipping...")
-                continue
-            self.data_dict[title] = text
+        # Writer thread that drains (title, text) pairs and writes them out
+        write_queue: queue.Queue = queue.Queue()
+        write_errors = []  # Exceptions raised by the writer thread
+
+        def write_worker():
+            while True:
+                item = write_queue.get()
+                if item is None:
+                    write_queue.task_done()
+                    break
+                title, text = item
+                try:
+                    # Stop writing after the first failure but keep draining
+                    # the queue so puts never back up behind a dead writer
+                    if not write_errors:
+                        self.__write_to_file(self.clean_data_path, title, text)
+                except Exception as e:
+                    write_errors.append(e)
+                finally:
+                    write_queue.task_done()
+
+        writer = threading.Thread(target=write_worker, daemon=True)
+        writer.start()
+
+        try:
+            with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+                for sections in tqdm(
+                    executor.map(partial(_clean_one, self), self.data, chunksize=4),
+                    total=len(self.data),
+                ):
+                    for title, text in sections:
+                        self.data_dict[title] = text
+                        write_queue.put((title, text))
+        finally:
+            # Flush any queued writes before returning
+            write_queue.put(None)
+            writer.join()
+
+        # Surface the first write failure as if the write had happened inline
+        if write_errors:
+            raise write_errors[0]
+
+    def _clean_file(self, file: str) -> List[Tuple[str, str]]:
+        """
+        Cleans a single file, dispatching on its extension.
+
+        Parameters:
+        - file: str, path to the file
+
+        Returns:
+        - List of (title, text) sections extracted from the file
+        """
+        # Built per call rather than stored on the instance because bound
+        # methods do not survive the pickling into worker processes
+        cleaners = {
+            "pdf": self.__clean_pdf,
+            "txt": self.__clean_txt,
+            "docx": self.__clean_docx,
+            "pptx": self.__clean_pptx,
+            "nxml": self.__clean_nxml,
+        }
+
+        ext = Path(file).suffix.lower().lstrip(".")
+        cleaner = cleaners.get(ext)
+        if cleaner is None:
+            print(
+                f"File {file} is not in the accepted file types. Should have been deleted... Skipping..."
+            )
+            return []
 
-            self.__write_to_file(self.clean_data_path, title, text)
+        if ext == "pdf":
+            return cleaner(file)
+
+        title, text = cleaner(file)
+        if title is None or text is None:
+            print(f"Error cleaning {file}. Skipping...")
+            return []
+        return [(title, text)]
 
     def __write_to_file(self, path: Path, title: str, text: str) -> None:
         """
@@ -158,9 +237,10 @@ class DataHandler:
         # Define the full path to save the cleaned data
         file_path = path / Path(safe_title + ".txt")
 
-        # Save the cleaned data
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(text)
+        # Save the cleaned data with one write syscall, skipping the
+        # TextIOWrapper buffering layer; the writer thread in clean_data
+        # already overlaps these writes with the CPU-bound parsing
+        file_path.write_bytes(text.encode("utf-8"))
 
     def vectorize_data(self) -> None:
         """
@@ -184,19 +264,48 @@ class DataHandler:
 
         print("Vectorizing data...")
 
-        current_count = 0  # To keep track of how many items are processed before saving
-        file_counter = 1  # To keep track of file names
-
-        # Vectorize the data and store them in batches
+        # Chunk every document first so the whole corpus can be embedded in one
+        # batched encoder call instead of one model call per document
+        all_chunks = []  # Every chunk across the corpus
+        owner_index = []  # (title, chunks) pairs in corpus order
         for title, text in tqdm(self.data_dict.items()):
             if title == ".gitkeep":
                 continue
+            chunks = chunk_text(text)
+            all_chunks.extend(chunks)
+            owner_index.append((title, chunks))
+
+        # Nothing left after skipping .gitkeep and empty documents
+        if not all_chunks:
+            print("No chunks to vectorize.")
+            return
+
+        # Embed only the chunks that are not already in the persistent cache,
+        # so reruns over an unchanged corpus skip the model entirely
+        cache = self.__load_embed_cache()
+        keys = [self.__embed_cache_key(chunk) for chunk in all_chunks]
+        miss_indices = [i for i, key in enumerate(keys) if key not in cache]
+
+        if miss_indices:
+            # Embed the cache misses in a single batched call
+            new_embeddings = embed_texts([all_chunks[i] for i in miss_indices])
+            for i, embedding in zip(miss_indices, new_embeddings):
+                cache[keys[i]] = embedding
+            self.__save_embed_cache(cache)
+
+        all_embeddings = np.stack([cache[key] for key in keys])
+
+        current_count = 0  # To keep track of how many items are processed before saving
+        file_counter = 1  # To keep track of file names
+        offset = 0  # Position of the current document's chunks in all_embeddings
 
-            embeddings, chunks = embed_text(text)
+        # Scatter the embeddings back to their documents and store them in batches
+        for title, chunks in owner_index:
+            embeddings = all_embeddings[offset : offset + len(chunks)]
+            offset += len(chunks)
 
-            # Vectorize the text (assuming embed_text is defined elsewhere)
             self.vectorized_data[title] = {
-                "embeddings": embeddings.tolist(),
+                "embeddings": embeddings,
                 "texts": chunks,
             }
 
@@ -214,15 +323,72 @@ class DataHandler:
         if self.vectorized_data:
             self.__save_vectorized_data(file_counter)
 
+    def __embed_cache_key(self, text: str) -> str:
+        """
+        Helper function that builds the cache key for a chunk of text.
+        The model name is part of the key so a model swap invalidates the cache.
+        """
+        return f"{EMBEDDING_MODEL}:{hashlib.blake2b(text.encode('utf-8')).hexdigest()}"
+
+    def __load_embed_cache(self) -> dict:
+        """
+        Helper function that loads the persistent embedding cache, mapping
+        cache keys (model name + content hash) to embedding vectors.
+        """
+        cache_path = self.vectorized_data_path / "embed_cache.npz"
+        if not cache_path.exists():
+            return {}
+        with np.load(cache_path) as cached:
+            # Keep only entries for the current model; vectors from another
+            # model have the wrong dimensions (and wrong values), so a model
+            # swap must drop them rather than mix them into the next save
+            prefix = f"{EMBEDDING_MODEL}:"
+            return {
+                key: vec
+                for key, vec in zip(cached["keys"].tolist(), cached["vecs"])
+                if key.startswith(prefix)
+            }
+
+    def __save_embed_cache(self, cache: dict) -> None:
+        """
+        Helper function that saves the embedding cache back to disk.
+        """
+        cache_path = self.vectorized_data_path / "embed_cache.npz"
+        np.savez(
+            cache_path,
+            keys=np.array(list(cache.keys())),
+            vecs=np.stack(list(cache.values())),
+        )
+
     def __save_vectorized_data(self, file_counter: int) -> None:
         """
         Helper function to save vectorized data to a file.
+
+        The embeddings are stored as one concatenated array with per-title
+        chunk counts, which loads straight into ndarrays instead of re-parsing
+        every float from JSON. The vectors are quantized to int8 with a
+        per-vector max-abs scale, quartering the disk footprint again;
+        load_vectorized_data dequantizes them back to float32.
         """
-        file_name = f"vectorized_data_{file_counter}.json"
-        with open(
-            self.vectorized_data_path / Path(file_name), "w", encoding="utf-8"
-        ) as f:
-            json.dump(self.vectorized_data, f)
+        file_name = f"vectorized_data_{file_counter}.npz"
+        values = list(self.vectorized_data.values())
+        vecs = np.concatenate(
+            [np.asarray(v["embeddings"], dtype=np.float32) for v in values]
+        )
+
+        # Quantize to int8: scale each vector so its largest component maps to 127
+        scales = np.abs(vecs).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.round(vecs / scales[:, None]).astype(np.int8)
+
+        np.savez_compressed(
+            self.vectorized_data_path / Path(file_name),
+            titles=np.array(list(self.vectorized_data.keys())),
+            counts=np.array([len(v["texts"]) for v in values], dtype=np.int64),
+            vecs=quantized,
+            scales=scales.astype(np.float32),
+            texts=np.array([t for v in values for t in v["texts"]]),
+        )
         # print(f"Saved vectorized data to {file_name}")
 
     def load_vectorized_data(self):
@@ -231,14 +397,19 @@ class DataHandler:
         instead of loading everything into memory at once.
         """
         for file in os.listdir(self.vectorized_data_path):
-            if file.endswith(".json"):
+            if file.endswith(".npz") and file != "embed_cache.npz":
                 print(f"Loading {file}...")
-                with open(
-                    self.vectorized_data_path / Path(file), "r", encoding="utf-8"
-                ) as f:
-                    data = json.load(f)
-                    for k, v in data.items():
-                        yield k, dict(v)
+                with np.load(self.vectorized_data_path / Path(file)) as data:
+                    # Dequantize the int8 vectors back to float32
+                    vecs = data["vecs"].astype(np.float32) * data["scales"][:, None]
+                    texts = data["texts"]
+                    offset = 0
+                    for title, count in zip(data["titles"], data["counts"]):
+                        yield str(title), {
+                            "embeddings": vecs[offset : offset + count],
+                            "texts": texts[offset : offset + count].tolist(),
+                        }
+                        offset += count
 
     def __clean_pdf(self, file: str) -> List[Tuple[str, str]]:
         """
@@ -276,7 +447,11 @@ class DataHandler:
             entry[1]: entry[2] - 1 for entry in toc
         }  # TOC uses 1-based indexing
 
-        # Step 4: Extract text per section
+        # Step 4: Extract every page exactly once, then slice per section.
+        # Sections can share pages, so slicing a cached list avoids repeated
+        # extraction of the same page.
+        page_texts = [page.get_text("text") for page in pdf]
+
         section_titles = list(section_map.keys())  # Ordered list of sections
         for i, section_title in enumerate(section_titles):
             start_page = section_map[section_title]
@@ -286,13 +461,8 @@ class DataHandler:
                 else len(pdf)
             )
 
-            # Extract text from section pages
-            section_text = []
-            for page_num in range(start_page, end_page):
-                section_text.append(pdf[page_num].get_text("text"))
-
             section_text = self.__clean_pdf_section_text(
-                "\n".join(section_text).strip()
+                "\n".join(page_texts[start_page:end_page]).strip()
             )
 
             sections_list.append((f"{title}: {section_title}", section_text))
@@ -313,7 +483,7 @@ class DataHandler:
         print(f"Cleaning {file} by font size since no TOC...")
 
         # Ensure it's a PDF
-        if file.split(".")[-1].lower() != "pdf":
+        if Path(file).suffix.lower() != ".pdf":
             raise ValueError(f"File {file} is not a PDF file. Cannot clean as PDF.")
 
         pdf = fitz.open(file)
@@ -380,16 +550,16 @@ class DataHandler:
         - cleaned_text: str, cleaned text
         """
         # Fix hyphenated words (e.g., "micro-\nscope" -> "microscope")
-        section_text = re.sub(r"(\w+)-\n(\w+)", r"\1\2", section_text)
+        section_text = _HYPHEN_RE.sub(r"\1\2", section_text)
 
         # Remove line breaks that occur mid-sentence or in the middle of a paragraph
-        section_text = re.sub(r"(?<!\n)\n(?!\n|\s*\w)", " ", section_text)
+        section_text = _MID_LINE_BREAK_RE.sub(" ", section_text)
 
         # Ensure that sentence-ending line breaks are preserved
-        section_text = re.sub(r"([.!?])\n+", r"\1\n", section_text)
+        section_text = _SENTENCE_BREAK_RE.sub(r"\1\n", section_text)
 
         # Clean extra spaces, removing excessive whitespaces or spaces around line breaks
-        section_text = re.sub(r"\s+", " ", section_text).strip()
+        section_text = _WHITESPACE_RE.sub(" ", section_text).strip()
 
         return section_text
 
@@ -406,7 +576,7 @@ class DataHandler:
         """
         # print(f"Cleaning {file}...")
         # Ensure right file type
-        if file.split(".")[-1] not in ["txt", "TXT"]:
+        if Path(file).suffix.lower() != ".txt":
             raise ValueError(f"File {file} is not a TXT file. Cannot clean as TXT.")
         # Open the TXT file
         with open(file, "r") as f:
@@ -427,7 +597,7 @@ class DataHandler:
         """
         # print(f"Cleaning {file}...")
         # Ensure right file type
-        if file.split(".")[-1] not in ["docx", "DOCX"]:
+        if Path(file).suffix.lower() != ".docx":
             raise ValueError(f"File {file} is not a DOCX file. Cannot clean as DOCX.")
         # Open the DOCX file
         text = docx2txt.process(file)
@@ -447,7 +617,7 @@ class DataHandler:
         """
         # print(f"Cleaning {file}...")
         # Ensure right file type
-        if file.split(".")[-1] not in ["pptx", "PPTX"]:
+        if Path(file).suffix.lower() != ".pptx":
             raise ValueError(f"File {file} is not a PPTX file. Cannot clean as PPTX.")
         # Open the PPTX file
         ppt = Presentation(file)
@@ -472,11 +642,12 @@ class DataHandler:
         """
         # print(f"Cleaning {file}...")
         # Ensure right file type
-        if file.split(".")[-1] != "nxml":
+        if Path(file).suffix.lower() != ".nxml":
             raise ValueError(f"File {file} is not an nxml file. Cannot clean as nxml.")
 
-        # Set up file extraction
-        tree = et.parse(file)
+        # Set up file extraction; skip lxml's ID hashing and allow deep trees
+        parser = et.XMLParser(huge_tree=True, collect_ids=False)
+        tree = et.parse(file, parser)
         root = tree.getroot()
 
         # Extract the title using title-group tag
@@ -488,17 +659,18 @@ class DataHandler:
 
         # print(f"Topic {title}...")
 
-        # Extract tags with the sec-type as long as it does not have the value of "Continuing Education Activity"
-        text = ""
-        for sec in root.findall(".//sec"):
-            sec_type = sec.get("sec-type")  # Access sec-type as an attribute of <sec>
-
-            if sec_type is not None and sec_type != "Continuing Education Activity":
-                for element in sec:  # Iterate over child elements in order
-                    if element.tag == "title" and element.text:
-                        text += element.text + "\n"
-                    elif element.tag == "p" and element.text:
-                        text += element.text + "\n"
+        # Extract tags with the sec-type as long as it does not have the value
+        # of "Continuing Education Activity". A single XPath query keeps the
+        # filtering inside libxml2 instead of per-node Python attribute reads.
+        nodes = root.xpath(
+            ".//sec[@sec-type and @sec-type!='Continuing Education Activity']"
+            "/*[self::title or self::p][text()]"
+        )
+        # node.text is None for elements that start with inline markup
+        # (e.g. <p><xref>...</xref> ...</p>), so filter those out like the
+        # old per-element loop did
+        parts = [node.text for node in nodes if node.text]
+        text = "\n".join(parts) + "\n" if parts else ""
 
         if text == "":
             print(f"Error extracting text from {file}. Skipping...")
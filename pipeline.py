@@ -25,40 +25,8 @@ from config import LLM_MODEL
 from data_handler import DataHandler
 from chroma import ChromaDB
 
-# Create an argument parser
-parser = argparse.ArgumentParser(
-    description="Run pipeline with command-line parameters."
-)
-parser.add_argument(
-    "--clean_data",
-    type=lambda x: x.lower() == "true",
-    default=True,
-    help="Whether to setup data (default: True)",
-)
-parser.add_argument(
-    "--vectorize_data",
-    type=lambda x: x.lower() == "true",
-    default=True,
-    help="Whether to vectorize data (default: True)",
-)
-args = parser.parse_args()
-
-# See if None
-if args is None:
-    clean_data = True
-    vectorize_data = True
-
-# Use the argument
-if args.clean_data:
-    clean_data = True
-else:
-    clean_data = False
-
-if args.vectorize_data:
-    vectorize_data = True
-else:
-    vectorize_data = False
-
+# Session reused across queries so each prompt skips TCP connection setup
+LLM_SESSION = requests.Session()
 
 def run_LLM(clean_data: bool = True, vectorize_data: bool = True):
     """
@@ -133,10 +101,15 @@ def __get_llm():
             r'Ollama is not installed. Please install it from https://ollama.com/download. If installed, ensure it\'s in your PATH. You can do this with: $env:Path += ";C:\Users\<YourUsername>\AppData\Local\Programs\Ollama\" and restarting your computer.'
         )
 
+    # Models already confirmed present, so each prompt skips the tags round trip
+    checked_models = set()
+
     def ensure_model(model: str):
+        if model in checked_models:
+            return
         try:
             # Check if model exists
-            tags = requests.get("http://localhost:11434/api/tags").json()
+            tags = LLM_SESSION.get("http://localhost:11434/api/tags").json()
             if model not in [m["name"] for m in tags.get("models", [])]:
                 print(f"Model '{model}' not found locally. Pulling with ollama CLI...")
                 subprocess.run(["ollama", "pull", model], check=True)
@@ -144,19 +117,25 @@ def __get_llm():
             raise RuntimeError(
                 f"Error downloading model '{model}': {e}\n\nPlease ensure Ollama is running and the model name is correct."
             )
+        checked_models.add(model)
+
+    # Check the default model once up front rather than on every prompt
+    ensure_model(LLM_MODEL)
 
     def llm(prompt: str, model=LLM_MODEL, host="http://localhost:11434"):
         ensure_model(model)
 
         try:
             print("LLM is preparing it's response...")
-            with requests.post(
+            with LLM_SESSION.post(
                 f"{host}/api/generate",
                 json={"model": model, "prompt": prompt, "stream": True},
                 stream=True,
             ) as response:
                 response.raise_for_status()
-                for line in response.iter_lines(decode_unicode=True):
+                # Feed the raw bytes straight to json.loads; decoding every
+                # line to str first is redundant work in the streaming loop
+                for line in response.iter_lines():
                     if line:
                         data = json.loads(line)
                         yield data.get("response", "")
@@ -228,4 +207,41 @@ def __set_up_and_run_LLM(vector_db):
     return response
 
 
-run_LLM(clean_data=clean_data, vectorize_data=vectorize_data)
+# Guarded so the clean_data worker processes can re-import this module under
+# the spawn/forkserver start methods without re-running the whole pipeline
+if __name__ == "__main__":
+    # Create an argument parser
+    parser = argparse.ArgumentParser(
+        description="Run pipeline with command-line parameters."
+    )
+    parser.add_argument(
+        "--clean_data",
+        type=lambda x: x.lower() == "true",
+        default=True,
+        help="Whether to setup data (default: True)",
+    )
+    parser.add_argument(
+        "--vectorize_data",
+        type=lambda x: x.lower() == "true",
+        default=True,
+        help="Whether to vectorize data (default: True)",
+    )
+    args = parser.parse_args()
+
+    # See if None
+    if args is None:
+        clean_data = True
+        vectorize_data = True
+
+    # Use the argument
+    if args.clean_data:
+        clean_data = True
+    else:
+        clean_data = False
+
+    if args.vectorize_data:
+        vectorize_data = True
+    else:
+        vectorize_data = False
+
+    run_LLM(clean_data=clean_data, vectorize_data=vectorize_data)